@@ -21,8 +21,13 @@ class Config(object):
         """
         I/O and path related configurations.
         """
-        self.input_file = os.path.normpath(args.input)
-        self.input_dir = os.path.normpath(args.input.split("/")[-1].split(".")[0])
+        if args.input:
+            self.input_file = os.path.normpath(args.input)
+            self.input_dir = os.path.normpath(args.input.split("/")[-1].split(".")[0])
+        else:
+            # Repairing only needs the teams of a previous run.
+            self.input_file = None
+            self.input_dir = os.path.dirname(os.path.normpath(args.teams)) or '.'
 
         if args.output:
             self.output = os.path.normpath(args.output)
@@ -34,18 +39,23 @@ class Config(object):
         """
         self.taxonomy_path = args.taxonomy
         self.taxonomy = {'js_frameworks': {}, 'programming_languages': {}, 'continuous_integration': {}}
-        with open(self.taxonomy_path, 'r') as f:
-            taxonomy = json.load(f)
-        self.taxonomy['frameworks'] = taxonomy['frameworks']
-        self.taxonomy['languages'] = taxonomy['languages']
-        self.taxonomy['continuous_integration'] = taxonomy['continuous_integration']
-        self.taxonomy['framework_synonyms'] = taxonomy['framework_synonyms']
-        self.taxonomy['design_skills'] = taxonomy['design_skills']
+        if self.taxonomy_path:
+            with open(self.taxonomy_path, 'r') as f:
+                taxonomy = json.load(f)
+            self.taxonomy['frameworks'] = taxonomy['frameworks']
+            self.taxonomy['languages'] = taxonomy['languages']
+            self.taxonomy['continuous_integration'] = taxonomy['continuous_integration']
+            self.taxonomy['framework_synonyms'] = taxonomy['framework_synonyms']
+            self.taxonomy['design_skills'] = taxonomy['design_skills']
 
         """
         Group assignment configurations.
         """
-        self.group_size = args.size
+        # Repairs take the size from the teams when it isn't given.
+        self.size_given = args.size is not None
+        self.group_size = args.size if self.size_given else 3
+        self.auto_size = args.auto_size
+        self.stats = args.stats
         self.key = args.key
         self.heuristic = HeuristicEnum.get_heuristic(args.group)
 
@@ -54,6 +64,34 @@ class Config(object):
         if args.teams:
             self.prebuilt_teams = True
             self.teams = os.path.normpath(args.teams)
+        self.removed = None
+        if args.removed:
+            self.removed = os.path.normpath(args.removed)
+
+        """
+        Ingestion configurations.
+        """
+        self.tolerant = args.tolerant
+        if args.quarantine:
+            self.quarantine = os.path.normpath(args.quarantine)
+        else:
+            self.quarantine = os.path.join(self.output, 'quarantine.csv')
+
+        """
+        Portfolio checking configurations.
+        """
+        self.check_urls = args.check_urls
+        if args.url_cache:
+            self.url_cache = os.path.normpath(args.url_cache)
+        else:
+            self.url_cache = os.path.join(self.output, 'url_cache.json')
+
+        """
+        Persistence configurations.
+        """
+        self.database = None
+        if args.database:
+            self.database = os.path.normpath(args.database)
 
 
 class CLI(object):
@@ -67,17 +105,42 @@ class CLI(object):
         """
         self.parser = argparse.ArgumentParser()
         # I/O and path related arguments.
-        self.parser.add_argument('-i', '--input', help='Where is the input?', type=str, required=True)
+        self.parser.add_argument('-i', '--input', help='Where is the input?', type=str)
         self.parser.add_argument('-o', '--output', help="path to write to", type=str)
 
         # Assignment details.
-        self.parser.add_argument('-s', '--size', help='What is the max group size', type=int, default=3)
+        self.parser.add_argument('-s', '--size', help='What is the max group size, defaults to 3', type=int)
+        self.parser.add_argument('-as', '--auto-size', help='Use the group size suggested by the input statistics',
+                                 action='store_true')
         self.parser.add_argument('-key', '--key', help='What is the unique identifier for the group member',
                                  type=str, default='email')
         self.parser.add_argument('-g', '--group', help='Which heuristic to use to assign teams', type=str,
-                                 choices={'naive', 'language', 'framework', 'experience', 'magic'}, default='naive')
-        self.parser.add_argument('-t', '--taxonomy', help="The json taxonomy of things", type=str, required=True)
+                                 choices={'naive', 'language', 'framework', 'experience', 'magic', 'community',
+                                          'balance', 'exact'}, default='naive')
+        self.parser.add_argument('-t', '--taxonomy', help="The json taxonomy of things", type=str)
         self.parser.add_argument('-pbt', '--teams', help='Path to json with pre-built teams', type=str, required=False)
+        self.parser.add_argument('-rm', '--removed', help='Path to the keys of members that dropped out of the teams',
+                                 type=str, required=False)
+
+        # Statistics.
+        self.parser.add_argument('-st', '--stats', help='Only count the skills in the input and write stats.json',
+                                 action='store_true')
+
+        # Ingestion.
+        self.parser.add_argument('-tol', '--tolerant', help='Quarantine bad rows instead of stopping',
+                                 action='store_true')
+        self.parser.add_argument('-q', '--quarantine', help='Where to write the quarantined rows', type=str,
+                                 required=False)
+
+        # Portfolio checking.
+        self.parser.add_argument('-cu', '--check-urls', help='Check that portfolio and Github URLs can be reached',
+                                 action='store_true')
+        self.parser.add_argument('-uc', '--url-cache', help='Where to cache the URL checks', type=str,
+                                 required=False)
+
+        # Persistence.
+        self.parser.add_argument('-db', '--database', help='Path to a sqlite database to store volunteers and groups',
+                                 type=str, required=False)
 
     def build_config(self, args: str) -> Config:
         """
@@ -85,4 +148,13 @@ class CLI(object):
         :param args: the raw input from the CLI.
         :return: Config object.
         """
-        return Config(self.parser.parse_args(args))
+        parsed = self.parser.parse_args(args)
+        if parsed.removed:
+            if not parsed.teams:
+                self.parser.error("-rm/--removed requires -pbt/--teams")
+        else:
+            if not parsed.input:
+                self.parser.error("the following arguments are required: -i/--input")
+            if not parsed.taxonomy:
+                self.parser.error("the following arguments are required: -t/--taxonomy")
+        return Config(parsed)
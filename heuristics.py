@@ -1,9 +1,17 @@
 import abc
 import logging
-from typing import Dict, List
+from typing import Dict, List, Set
 from enum import IntEnum
 import operator
 import json
+import math
+import random
+import heapq
+import itertools
+import time
+from collections import Counter
+from enums import ProgrammingLanguages as PL
+from member import Designer
 
 
 class HeuristicEnum(IntEnum):
@@ -12,16 +20,25 @@ class HeuristicEnum(IntEnum):
     FRAMEWORK = 4
     EXPERIENCE = 8
     MAGIC = 16
+    COMMUNITY = 32
+    BALANCE = 64
+    EXACT = 128
 
-    def get_strategy(self, size: int) -> 'Heuristic':
+    def get_strategy(self, size: int, store=None) -> 'Heuristic':
         if self.value == HeuristicEnum.LANGUAGE:
-            return LanguageHeuristic(size)
+            return LanguageHeuristic(size, store)
         elif self.value == HeuristicEnum.FRAMEWORK:
-            return FrameworkHeuristic(size)
+            return FrameworkHeuristic(size, store)
         elif self.value == HeuristicEnum.EXPERIENCE:
             return ExperienceHeuristic(size)
         elif self.value == HeuristicEnum.MAGIC:
             return MagicHeuristic(size)
+        elif self.value == HeuristicEnum.COMMUNITY:
+            return CommunityHeuristic(size)
+        elif self.value == HeuristicEnum.BALANCE:
+            return BalanceHeuristic(size)
+        elif self.value == HeuristicEnum.EXACT:
+            return ExactHeuristic(size)
         else:
             return NaiveHeuristic(size)
 
@@ -36,6 +53,12 @@ class HeuristicEnum(IntEnum):
             return HeuristicEnum.EXPERIENCE
         elif heuristic == 'magic':
             return HeuristicEnum.MAGIC
+        elif heuristic == 'community':
+            return HeuristicEnum.COMMUNITY
+        elif heuristic == 'balance':
+            return HeuristicEnum.BALANCE
+        elif heuristic == 'exact':
+            return HeuristicEnum.EXACT
         else:
             return HeuristicEnum.NAIVE
 
@@ -45,10 +68,12 @@ class Heuristic(metaclass=abc.ABCMeta):
     The base class for the heuristic.
     This is the base strategy class
     """
-    def __init__(self, size: int, heuristic: HeuristicEnum):
+    def __init__(self, size: int, heuristic: HeuristicEnum, store=None):
         self.log = logging.getLogger(self.__class__.__name__)
         self.size = size
         self.heuristic = heuristic
+        # An optional VolunteerStore to look members up by skill.
+        self.store = store
         self.administrative = dict()
         self.groups = dict()
         self.leaders = list()
@@ -60,16 +85,66 @@ class Heuristic(metaclass=abc.ABCMeta):
         self.administrative['leaders'] = len(members['leaders'])
         for l in members['leaders']:
             self.leaders.append(l.email)
+        # Only filled in when the portfolios were checked.
+        unreachable = {m.email: sorted(u for u, r in m.reachable.items() if not r)
+                       for group in ('leaders', 'members') for m in members[group] if not all(m.reachable.values())}
+        if unreachable:
+            self.administrative['unreachable'] = unreachable
         pass
 
     @abc.abstractmethod
     def build_groups(self, volunteers: Dict) -> str:
         pass
 
+    def candidates(self, volunteers: Dict, language: PL = None, framework: str = None) -> List:
+        """
+        The members that know a language or framework.  With a store this is
+        answered by its skill indexes, otherwise every member is checked.
+        :param volunteers: the volunteers to pick from.
+        :param language: a programming language they know.
+        :param framework: a framework they know.
+        :return: the matching members, in the order they were read.
+        """
+        if self.store is not None:
+            # The store answers most experienced first, the groups shouldn't depend on whether one is used.
+            keys = set(self.store.candidates(language=language, framework=framework))
+            return [m for m in volunteers['members'] if m.email in keys]
+        return [m for m in volunteers['members']
+                if (language is None or language in m.ranking['languages']) and
+                (framework is None or framework in m.ranking['frameworks'])]
+
     def add_group(self, x: int):
         if x not in self.groups:
             self.groups[x] = {'members': list(), 'leader': None, 'expertise': set()}
 
+    @staticmethod
+    def skills(member) -> Set:
+        """
+        The skills a member brings to a group, the known languages and frameworks.
+        :param member: the member.
+        :return: set of skills.
+        """
+        skills = {l.name for l in member.ranking['languages'] if l != PL.UNKNOWN}
+        skills.update(member.ranking['frameworks'])
+        return skills
+
+    @staticmethod
+    def score(groups: str, volunteers: Dict) -> int:
+        """
+        How cohesive the groups are: for every pair of members in
+        the same group, the number of skills they share.
+        This lets the output of any heuristic be compared.
+        :param groups: the json output of a heuristic.
+        :param volunteers: the volunteers the groups were built from.
+        :return: the score, higher is better.
+        """
+        skills = {m.email: Heuristic.skills(m) for m in volunteers['members']}
+        total = 0
+        for group in json.loads(groups)['groups'].values():
+            counts = Counter(s for m in group['members'] for s in skills.get(m, ()))
+            total += sum(c * (c - 1) // 2 for c in counts.values())
+        return total
+
     @staticmethod
     def set_default(obj):
         if isinstance(obj, set):
@@ -112,8 +187,8 @@ class LanguageHeuristic(Heuristic):
     """
     This builds the groups by languages.
     """
-    def __init__(self, size: int):
-        super().__init__(size, HeuristicEnum.LANGUAGE)
+    def __init__(self, size: int, store=None):
+        super().__init__(size, HeuristicEnum.LANGUAGE, store)
         self.buckets = dict()
         self.unassigned = set()
 
@@ -132,9 +207,8 @@ class LanguageHeuristic(Heuristic):
         self.add_group(x)
         assigned = set()
         for k, v in self.buckets.items():
-            for m in volunteers['members']:
-                if m.email not in assigned and k in m.ranking['languages'] and \
-                        len(self.groups[x]['members']) < self.size:
+            for m in self.candidates(volunteers, language=k):
+                if m.email not in assigned and len(self.groups[x]['members']) < self.size:
                     self.groups[x]['members'].append(m.email)
                     assigned.add(m.email)
                     self.unassigned.remove(m.email)
@@ -158,8 +232,8 @@ class FrameworkHeuristic(Heuristic):
     """
     This will assign groups by the framework familiarity.
     """
-    def __init__(self, size: int):
-        super().__init__(size, HeuristicEnum.FRAMEWORK)
+    def __init__(self, size: int, store=None):
+        super().__init__(size, HeuristicEnum.FRAMEWORK, store)
         self.buckets = dict()
         self.unassigned = set()
 
@@ -179,9 +253,8 @@ class FrameworkHeuristic(Heuristic):
         self.add_group(x)
         assigned = set()
         for k, v in self.buckets.items():
-            for m in volunteers['members']:
-                if m.email not in assigned and k in m.ranking['frameworks'] and \
-                        len(self.groups[x]['members']) < self.size:
+            for m in self.candidates(volunteers, framework=k):
+                if m.email not in assigned and len(self.groups[x]['members']) < self.size:
                     self.groups[x]['members'].append(m.email)
                     assigned.add(m.email)
                     self.unassigned.remove(m.email)
@@ -262,3 +335,578 @@ class MagicHeuristic(Heuristic):
         naive = NaiveHeuristic(self.size)
         naive.build_groups(volunteers)
         return naive.to_json()
+
+
+class CommunityHeuristic(Heuristic):
+    """
+    This will group members whose skills occur together.
+    Members and their skills form a weighted bipartite graph,
+    label propagation finds the communities in it, and the
+    communities are then cut into groups.
+    """
+    def __init__(self, size: int, iterations: int = 20, seed: int = 0):
+        super().__init__(size, HeuristicEnum.COMMUNITY)
+        self.iterations = iterations
+        self.random = random.Random(seed)
+        # Members are nodes [0, n), skills are nodes [n, n + skills).
+        self.members = 0
+        self.adjacency = list()
+        self.skill_nodes = list()
+
+    def preprocess(self, members: Dict):
+        super().preprocess(members)
+        skill_ids = dict()
+        mentions = list()
+        for m in members['members']:
+            ids = list()
+            for skill in sorted(Heuristic.skills(m)):
+                if skill not in skill_ids:
+                    skill_ids[skill] = len(self.skill_nodes)
+                    self.skill_nodes.append(skill)
+                ids.append(skill_ids[skill])
+            mentions.append(ids)
+
+        self.members = n = len(mentions)
+        degree = Counter(s for ids in mentions for s in ids)
+        self.adjacency = [list() for _ in range(n + len(self.skill_nodes))]
+        for i, ids in enumerate(mentions):
+            for s in ids:
+                # Skills everyone knows say little about who belongs together.
+                weight = math.log(n / degree[s])
+                if weight > 0:
+                    self.adjacency[i].append((n + s, weight))
+                    self.adjacency[n + s].append((i, weight))
+
+    def propagate(self) -> List[int]:
+        """
+        Asynchronous label propagation over the member-skill graph.
+        Each pass is linear in the number of skill mentions.
+        :return: the community label of every node.
+        """
+        labels = list(range(len(self.adjacency)))
+        order = [x for x in range(len(self.adjacency)) if self.adjacency[x]]
+        for _ in range(self.iterations):
+            self.random.shuffle(order)
+            changed = 0
+            for x in order:
+                weights = dict()
+                for y, w in self.adjacency[x]:
+                    weights[labels[y]] = weights.get(labels[y], 0.0) + w
+                best = max(weights.values())
+                if weights.get(labels[x], 0.0) == best:
+                    continue
+                labels[x] = self.random.choice([l for l, w in weights.items() if w == best])
+                changed += 1
+            if not changed:
+                break
+        return labels
+
+    def build_groups(self, volunteers: Dict) -> str:
+        self.preprocess(volunteers)
+        members = volunteers['members']
+        labels = self.propagate()
+
+        communities = dict()
+        for i in range(len(members)):
+            communities.setdefault(labels[i], list()).append(i)
+        self.administrative['communities'] = len(communities)
+
+        # Inside a community, line members up by their rarest skills
+        # so that each cut takes people who share the most specific ones.
+        def signature(i: int) -> tuple:
+            return tuple(y for y, w in sorted(self.adjacency[i], key=lambda e: (-e[1], e[0])))
+        for community in communities.values():
+            community.sort(key=signature)
+
+        # Full groups come straight out of a community, what's left over
+        # is pooled with the leftovers of the next largest communities.
+        x = 0
+        leftovers = list()
+        for community in sorted(communities.values(), key=len, reverse=True):
+            whole = len(community) - len(community) % self.size
+            for y in range(0, whole, self.size):
+                self.add_community_group(x, [members[i] for i in community[y:y + self.size]])
+                x += 1
+            leftovers.extend(community[whole:])
+        for y in range(0, len(leftovers), self.size):
+            self.add_community_group(x, [members[i] for i in leftovers[y:y + self.size]])
+            x += 1
+
+        return self.to_json()
+
+    def add_community_group(self, x: int, members: List):
+        self.add_group(x)
+        skills = Counter(s for m in members for s in Heuristic.skills(m))
+        self.groups[x]['members'] = [m.email for m in members]
+        self.groups[x]['expertise'] = {s for s, c in skills.items() if c > 1 or len(members) == 1}
+
+
+class BalanceHeuristic(Heuristic):
+    """
+    This will spread frontend, backend, experience and
+    design skills evenly across the groups.  It is a snake
+    draft over several dimensions: the strongest members go
+    first, each to the group that is furthest behind in the
+    dimension the member contributes most to.
+    """
+    DIMENSIONS = ('frontend', 'backend', 'experience', 'design')
+
+    def __init__(self, size: int):
+        super().__init__(size, HeuristicEnum.BALANCE)
+        self.vectors = list()
+        self.targets = list()
+
+    def preprocess(self, members: Dict):
+        super().preprocess(members)
+        for m in members['members']:
+            design = 0
+            for p in m.professions:
+                if isinstance(p, Designer):
+                    design += len(p.design_skills)
+            self.vectors.append((m.ranking['frontend'], m.ranking['backend'], m.experience, design))
+
+    def build_groups(self, volunteers: Dict) -> str:
+        self.preprocess(volunteers)
+        members = volunteers['members']
+        if not members:
+            return self.to_json()
+        count = (len(members) + self.size - 1) // self.size
+        dimensions = len(BalanceHeuristic.DIMENSIONS)
+        # What every group should end up with, used to put the dimensions on the same scale.
+        self.targets = [max(sum(v[d] for v in self.vectors) / count, 1e-9) for d in range(dimensions)]
+
+        totals = [[0] * dimensions for _ in range(count)]
+        sizes = [0] * count
+
+        def key(x: int, d: int) -> tuple:
+            # The group that is furthest behind, or with the fewest members, comes first.
+            if d == dimensions:
+                return sizes[x], x
+            return totals[x][d] / self.targets[d], sizes[x], x
+
+        # One heap per dimension and one for the member count, each holding every
+        # open group exactly once.  Only the group that just got a member changes,
+        # so its stale entries in the other heaps are fixed when they surface.
+        heaps = [[key(x, d) for x in range(count)] for d in range(dimensions + 1)]
+        for h in heaps:
+            heapq.heapify(h)
+
+        def weight(i: int) -> List[float]:
+            return [self.vectors[i][d] / self.targets[d] for d in range(dimensions)]
+
+        order = sorted(range(len(members)), key=lambda i: (-sum(weight(i)), members[i].uid))
+        for i in order:
+            w = weight(i)
+            d = max(range(dimensions), key=lambda y: w[y]) if any(w) else dimensions
+            h = heaps[d]
+            while True:
+                x = h[0][-1]
+                if sizes[x] >= self.size:
+                    heapq.heappop(h)
+                elif h[0] != key(x, d):
+                    heapq.heapreplace(h, key(x, d))
+                else:
+                    break
+            self.add_group(x)
+            self.groups[x]['members'].append(members[i].email)
+            sizes[x] += 1
+            for y in range(dimensions):
+                totals[x][y] += self.vectors[i][y]
+            if sizes[x] < self.size:
+                heapq.heapreplace(h, key(x, d))
+            else:
+                heapq.heappop(h)
+
+        for x, group in self.groups.items():
+            group['expertise'] = dict(zip(BalanceHeuristic.DIMENSIONS, totals[x]))
+            group['size'] = sizes[x]
+        return self.to_json()
+
+
+class ExactHeuristic(Heuristic):
+    """
+    This will find the groups with the best possible score
+    (see Heuristic.score) by branch-and-bound.  It is only
+    meant for small cohorts, and as a baseline to measure
+    how far the other heuristics are from optimal.
+    """
+    def __init__(self, size: int, limit: float = 30.0):
+        super().__init__(size, HeuristicEnum.EXACT)
+        # Seconds to search before settling for the best groups found so far.
+        self.limit = limit
+        self.names = list()
+        self.member_skills = list()
+        self.affinity = list()
+        self.ranked = list()
+        self.shared = list()
+        self.prices = list()
+        self.columns = list()
+        self.count = 0
+        self.nodes = 0
+        self.best = -1
+        self.best_groups = list()
+        self.memo = dict()
+        self.deadline = 0.0
+        self.timed_out = False
+
+    def preprocess(self, members: Dict):
+        super().preprocess(members)
+        ids = dict()
+        for m in members['members']:
+            skills = list()
+            for s in sorted(Heuristic.skills(m)):
+                if s not in ids:
+                    ids[s] = len(self.names)
+                    self.names.append(s)
+                skills.append(ids[s])
+            self.member_skills.append(skills)
+
+    def build_groups(self, volunteers: Dict) -> str:
+        self.preprocess(volunteers)
+        members = volunteers['members']
+        n = len(members)
+        if not n:
+            return self.to_json()
+        if n > 36:
+            self.log.warning("{} members is a lot for an exact search, it may not finish".format(n))
+        self.count = (n + self.size - 1) // self.size
+
+        # Each group is built around the first member not yet placed, so the most connected
+        # members go first, their groups are found early and the bounds bite.
+        popularity = Counter(s for skills in self.member_skills for s in skills)
+        order = sorted(range(n), key=lambda i: (-sum(popularity[s] - 1 for s in self.member_skills[i]),
+                                                members[i].uid))
+        self.member_skills = [self.member_skills[i] for i in order]
+        self.affinity = [[len(set(a) & set(b)) for b in self.member_skills] for a in self.member_skills]
+        self.split()
+
+        self.greedy(n)
+        self.price()
+        self.deadline = time.time() + self.limit
+        self.search((1 << n) - 1, 0, list())
+        if self.timed_out:
+            self.log.warning("Stopped after {}s, the groups may not be optimal".format(self.limit))
+
+        for x, group in enumerate(self.best_groups):
+            self.add_group(x)
+            self.groups[x]['members'] = [members[order[i]].email for i in group]
+            counts = Counter(s for i in group for s in self.member_skills[i])
+            self.groups[x]['expertise'] = {self.names[s] for s, c in counts.items() if c > 1}
+            self.groups[x]['size'] = len(group)
+        self.administrative['score'] = self.best
+        self.administrative['optimal'] = not self.timed_out
+        self.administrative['nodes'] = self.nodes
+        return self.to_json()
+
+    def greedy(self, n: int, restarts: int = 20):
+        """
+        Places each member in the group they gain the most from, then moves
+        and swaps members between groups while that helps.  This is done
+        again from a few shuffled orders, and the best groups give the search
+        a good score to beat from the start.
+        :param n: the number of members.
+        :param restarts: how many shuffled orders to try after the first.
+        """
+        shuffler = random.Random(n)
+        order = list(range(n))
+        for _ in range(restarts + 1):
+            groups = list()
+            for y in order:
+                options = [g for g in groups if len(g) < self.size]
+                best = max(options, key=lambda g: self.affinity_to(y, g), default=None)
+                if best is None or (not self.affinity_to(y, best) and len(groups) < self.count):
+                    best = list()
+                    groups.append(best)
+                best.append(y)
+            self.improve(groups)
+            score = sum(self.affinity_to(y, g) for g in groups for y in g) // 2
+            if score > self.best:
+                self.best = score
+                self.best_groups = [g for g in groups if g]
+            shuffler.shuffle(order)
+
+    def affinity_to(self, y: int, group: List) -> int:
+        return sum(self.affinity[y][z] for z in group if z != y)
+
+    def improve(self, groups: List):
+        """
+        Moves members to groups with room, and swaps members between
+        groups, until neither raises the score.
+        :param groups: the groups, changed in place.
+        """
+        improved = True
+        while improved:
+            improved = False
+            for here in groups:
+                for y in list(here):
+                    for there in groups:
+                        if there is here or len(there) >= self.size:
+                            continue
+                        if self.affinity_to(y, there) > self.affinity_to(y, here):
+                            here.remove(y)
+                            there.append(y)
+                            improved = True
+                            break
+            for x, one in enumerate(groups):
+                for other in groups[x + 1:]:
+                    for a in list(one):
+                        for b in list(other):
+                            if a not in one:
+                                break
+                            before = self.affinity_to(a, one) + self.affinity_to(b, other)
+                            after = (self.affinity_to(a, other) - self.affinity[a][b] +
+                                     self.affinity_to(b, one) - self.affinity[a][b])
+                            if after > before:
+                                one[one.index(a)] = b
+                                other[other.index(b)] = a
+                                improved = True
+                                break
+
+    def split(self, rounds: int = 300):
+        """
+        What a pair of members share is split between the two, and a member
+        can take at most its best shares with the others in its group, so the
+        sum of those is never less than the score.  An even split overshoots
+        when a member's best partners would rather be with someone else, so
+        the shares are moved towards whoever wants the pair less, keeping the
+        split with the lowest total.  Any split is safe, so the one found here
+        is used all through the search.
+        """
+        n = len(self.affinity)
+        share = [[a / 2 for a in row] for row in self.affinity]
+        best = None
+        lowest = None
+        step = 1.0
+        for _ in range(rounds):
+            chosen = list()
+            total = 0.0
+            for y in range(n):
+                top = sorted(((share[y][z], z) for z in range(n) if z != y and self.affinity[y][z]),
+                             reverse=True)[:self.size - 1]
+                total += sum(s for s, z in top)
+                chosen.append({z for s, z in top})
+            if lowest is None or total < lowest:
+                lowest = total
+                best = [list(row) for row in share]
+            moved = False
+            for y in range(n):
+                for z in range(y + 1, n):
+                    wanted = (z in chosen[y]) - (y in chosen[z])
+                    if wanted and self.affinity[y][z]:
+                        moved = True
+                        share[y][z] = min(self.affinity[y][z], max(0.0, share[y][z] - step * wanted))
+                        share[z][y] = self.affinity[y][z] - share[y][z]
+            if not moved:
+                break
+            step *= 0.98
+        # ranked[y]: y's share with everyone it shares a skill with, the largest first.
+        self.ranked = [sorted(((best[y][z], z) for z in range(n) if z != y and self.affinity[y][z]),
+                              reverse=True) for y in range(n)]
+        # shared[z]: everyone that has a share with z, and how big it is.
+        self.shared = [[(y, best[y][z]) for y in range(n) if y != z and self.affinity[y][z]] for z in range(n)]
+
+    def price(self, rounds: int = 30, most: int = 100000):
+        """
+        Gives each member a price, so the groups left can score at most the
+        prices of the members left, plus the most that many groups could score
+        over the price of their members.  This holds for any prices, it starts
+        from each member's best shares and lowers the prices of the members in
+        too many of the best groups, raising those left out, keeping the prices
+        with the lowest total.  Every group is looked at, so this is skipped
+        when there are too many.
+        :param rounds: how many times to adjust the prices.
+        :param most: the most groups to look at, beyond this only the shares are used.
+        """
+        n = len(self.affinity)
+        if sum(math.comb(n, k) for k in range(1, self.size + 1)) > most:
+            return
+        everyone = (1 << n) - 1
+        prices = [self.partners(y, everyone)[self.size - 1] for y in range(n)]
+        groups = [(sum(self.affinity[a][b] for a, b in itertools.combinations(g, 2)), g)
+                  for k in range(1, self.size + 1) for g in itertools.combinations(range(n), k)]
+        lowest = None
+        best = prices
+        scale = 1.0
+        for _ in range(rounds):
+            over = heapq.nlargest(self.count, ((s - sum(prices[y] for y in g), g) for s, g in groups))
+            over = [(o, g) for o, g in over if o > 0]
+            total = sum(prices) + sum(o for o, g in over)
+            if lowest is None or total < lowest:
+                lowest = total
+                best = prices
+            step = [1.0] * n
+            for o, g in over:
+                for y in g:
+                    step[y] -= 1
+            norm = sum(s * s for s in step)
+            if not norm or total <= self.best:
+                break
+            prices = [p - scale * (total - self.best) / norm * s for p, s in zip(prices, step)]
+            scale *= 0.97
+        self.prices = best
+        # columns: the groups that score over their price, by how much, the most first.
+        self.columns = sorted(((s - sum(best[y] for y in g), sum(1 << y for y in g)) for s, g in groups
+                               if s - sum(best[y] for y in g) > 0), reverse=True)
+
+    def over(self, among: int, count: int, limit: int = 64) -> float:
+        """
+        The most `count` groups out of a set of members can score over their price.
+        :param among: the members, as a bitmask.
+        :param count: how many groups.
+        :param limit: how many groups to look at, after that the last is taken for the rest.
+        """
+        total = 0.0
+        for seen, (o, mask) in enumerate(self.columns):
+            if not count:
+                break
+            if seen == limit:
+                return total + count * o
+            if mask & among == mask:
+                total += o
+                count -= 1
+        return total
+
+    def partners(self, y: int, among: int) -> List[float]:
+        """
+        The most member y can take from its shares with k others out of a set of members.
+        :param y: the member.
+        :param among: the members to pick from, as a bitmask.
+        :return: the best total for each k up to one less than the group size.
+        """
+        top = [0.0]
+        for a, z in self.ranked[y]:
+            if among >> z & 1:
+                top.append(top[-1] + a)
+                if len(top) == self.size:
+                    return top
+        return top + [top[-1]] * (self.size - len(top))
+
+    def search(self, remaining: int, score: int, groups: List):
+        """
+        Builds the next group around the first member still to be placed.
+        Once a group is full it is never touched again, so what the rest can
+        score only depends on who is left, and a set of members reached again
+        with no better score is not searched twice.
+        :param remaining: the members still to be placed, as a bitmask.
+        :param score: the score of the groups built so far.
+        :param groups: the groups built so far.
+        """
+        if not remaining:
+            if score > self.best:
+                self.best = score
+                self.best_groups = [list(g) for g in groups]
+            return
+        if self.memo.get(remaining, -1) >= score:
+            return
+        self.memo[remaining] = score
+        left = self.count - len(groups)
+        members = bin(remaining).count('1')
+        if left == 1:
+            group = [y for y in range(len(self.member_skills)) if remaining >> y & 1]
+            groups.append(group)
+            self.search(0, score + sum(self.affinity[a][b] for a in group for b in group if a < b), groups)
+            groups.pop()
+            return
+        # Every group that is left needs at least one member, and none may go over the size.
+        smallest = max(1, members - (left - 1) * self.size)
+        largest = min(self.size, members - (left - 1))
+        anchor = (remaining & -remaining).bit_length() - 1
+        rest = remaining & ~(1 << anchor)
+        tops = [self.partners(y, rest) if rest >> y & 1 else None for y in range(len(self.member_skills))]
+        groups.append([anchor])
+        self.fill(rest, rest, list(self.affinity[anchor]), tops, 0, smallest, largest, score, groups)
+        groups.pop()
+
+    def priced(self, rest: int, open_to: int, gains: List[int], tops: List, free: int, later: int) -> float:
+        """
+        The same as the bound in fill, with the members not joining this
+        group bounded by their prices rather than their shares.
+        :param later: how many groups are left after this one.
+        """
+        total = 0.0
+        extra = list()
+        y = rest
+        while y:
+            low = y & -y
+            z = low.bit_length() - 1
+            y ^= low
+            total += self.prices[z]
+            if open_to & low:
+                extra.append(gains[z] + tops[z][free - 1] - self.prices[z])
+        extra.sort(reverse=True)
+        return total + sum(e for e in extra[:free] if e > 0) + self.over(rest, later)
+
+    def fill(self, rest: int, open_to: int, gains: List[int], tops: List, value: int,
+             smallest: int, largest: int, score: int, groups: List):
+        """
+        Adds members to the last group, each set of members is tried once.
+        :param rest: the members not in any group yet, as a bitmask.
+        :param open_to: the members that may still join this group, as a bitmask.
+        :param gains: how much each member shares with this group.
+        :param tops: what each member not in a group can take from the others, see partners.
+        :param value: the score of this group.
+        :param smallest: the fewest members this group may have.
+        :param largest: the most members this group may have.
+        :param score: the score of the groups before this one.
+        :param groups: the groups built so far, this one last.
+        """
+        if self.timed_out:
+            return
+        self.nodes += 1
+        if not self.nodes % 4096 and time.time() > self.deadline:
+            self.timed_out = True
+            return
+        group = groups[-1]
+        if len(group) >= smallest:
+            self.search(rest, score + value, groups)
+        free = largest - len(group)
+        if not free or not open_to:
+            return
+
+        # Each member left gains at most its shares with the best of the others.
+        # Those joining this group also gain all they share with it, but only `free` of them can.
+        total = 0.0
+        extra = list()
+        candidates = list()
+        y = rest
+        while y:
+            low = y & -y
+            z = low.bit_length() - 1
+            y ^= low
+            top = tops[z]
+            stay = top[self.size - 1]
+            total += stay
+            if open_to & low:
+                join = gains[z] + top[free - 1]
+                extra.append(join - stay)
+                candidates.append((gains[z], z))
+        extra.sort(reverse=True)
+        total += sum(e for e in extra[:free] if e > 0)
+        # Scores are whole numbers, so a fractional bound can be rounded down,
+        # leaving a little room for the rounding of the shares.
+        if score + value + int(total + 1e-6) <= self.best:
+            return
+        if self.prices:
+            total = self.priced(rest, open_to, gains, tops, free, self.count - len(groups))
+            if score + value + int(total + 1e-6) <= self.best:
+                return
+
+        # Members with the same skills are interchangeable, so only the first is tried.
+        tried = set()
+        candidates.sort(key=lambda c: -c[0])
+        for gain, z in candidates:
+            kind = tuple(self.member_skills[z])
+            open_to &= ~(1 << z)
+            if kind in tried:
+                continue
+            tried.add(kind)
+            group.append(z)
+            left = rest & ~(1 << z)
+            # Only the members that took a share from z need theirs worked out again.
+            changed = list(tops)
+            for y, share in self.shared[z]:
+                if left >> y & 1 and share >= tops[y][-1] - tops[y][-2] - 1e-9:
+                    changed[y] = self.partners(y, left)
+            self.fill(left, open_to, [g + a for g, a in zip(gains, self.affinity[z])], changed, value + gain,
+                      smallest, largest, score, groups)
+            group.pop()
@@ -1,17 +1,48 @@
 import sys
+import json
 import logging
 from cli import CLI
 import volunteers as v
+from store import VolunteerStore
+from portfolio import PortfolioChecker
+from repair import GroupRepair
 
 
 def main(args: str):
     logger = logging.getLogger(__name__)
     config = CLI().build_config(args)
-    volunteers = v.Volunteers(config).build_volunteers()
-    heuristic = config.heuristic.get_strategy(config.group_size)
-    groups = heuristic.build_groups(volunteers)
+    if config.stats:
+        stats = v.Volunteers(config).build_statistics()
+        with open("{}/stats.json".format(config.output), 'w') as f:
+            json.dump(stats, f, indent=4, sort_keys=True)
+        return
+    if config.removed:
+        size = config.group_size if config.size_given else None
+        groups = GroupRepair(size).repair_file(config.teams, config.removed)
+    else:
+        if config.auto_size:
+            suggestions = v.Volunteers(config).build_statistics()['suggestions']
+            config.group_size = suggestions['group_size']
+            if not suggestions['covered']:
+                logger.warning("There aren't enough leaders or designers for every group at any size up to 10")
+            logger.info("Using a group size of {}".format(config.group_size))
+        loader = v.Volunteers(config)
+        volunteers = loader.build_volunteers()
+        if config.check_urls:
+            PortfolioChecker(config.url_cache).check_volunteers(volunteers)
+        if config.database:
+            with VolunteerStore(config.database) as store:
+                store.save_volunteers(volunteers, loader.quarantined)
+                heuristic = config.heuristic.get_strategy(config.group_size, store)
+                groups = heuristic.build_groups(volunteers)
+                store.save_assignments(config.heuristic.name, config.group_size, groups)
+        else:
+            heuristic = config.heuristic.get_strategy(config.group_size)
+            groups = heuristic.build_groups(volunteers)
     if config.output:
-        with open("{}/output.json".format(config.output), 'w') as f:
+        # Repairs never overwrite the teams they were made from.
+        name = 'output.repaired.json' if config.removed else 'output.json'
+        with open("{}/{}".format(config.output, name), 'w') as f:
             f.write(groups)
     else:
         logger.warning(groups)
@@ -78,6 +78,8 @@ class Member(metaclass=abc.ABCMeta):
         for r in professions:
             self.roles += r.rid
         self.portfolio = portfolio
+        # URL => whether it could be reached, filled in by the PortfolioChecker.
+        self.reachable = dict()
         self.ranking = ranking
 
     @staticmethod
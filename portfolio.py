@@ -0,0 +1,222 @@
+import asyncio
+import json
+import logging
+import os
+import ssl
+import time
+from typing import Dict, Iterable, Optional, Tuple
+from urllib.parse import urlsplit
+
+
+class PortfolioChecker(object):
+    """
+    Checks that the portfolio and Github URLs of the volunteers
+    can be reached.  Every URL is checked concurrently with a
+    HEAD request over pooled keep-alive connections, and the
+    results are cached on disk between runs.
+    """
+    def __init__(self, cache_path: Optional[str] = None, concurrency: int = 64, per_host: int = 4,
+                 timeout: float = 10.0, ttl: float = 7 * 24 * 60 * 60):
+        """
+        :param cache_path: the json file to cache results in, None to not cache.
+        :param concurrency: how many requests may be in flight at once.
+        :param per_host: how many requests may be in flight to a single host.
+        :param timeout: seconds to wait for a single URL.
+        :param ttl: seconds a cached answer stays valid, errors are never cached.
+        """
+        self.log = logging.getLogger(self.__class__.__name__)
+        self.cache_path = cache_path
+        self.concurrency = concurrency
+        self.per_host = per_host
+        self.timeout = timeout
+        self.ttl = ttl
+        self.cache = dict()
+        self.idle = dict()
+        self.hosts = dict()
+        self.limit = None
+        self.ssl = ssl.create_default_context()
+        if self.cache_path and os.path.exists(self.cache_path):
+            with open(self.cache_path, 'r') as f:
+                self.cache = json.load(f)
+
+    def check_volunteers(self, volunteers: Dict) -> Dict[str, Dict]:
+        """
+        Checks the URLs of every volunteer and annotates each member with
+        whether their URLs could be reached.
+        :param volunteers: the output of Volunteers.build_volunteers.
+        :return: the result of every URL.
+        """
+        members = [m for group in volunteers.values() for m in group]
+        results = asyncio.run(self.check({u for m in members for u in m.portfolio}))
+        unreachable = 0
+        for m in members:
+            m.reachable = {u: results[u]['reachable'] for u in m.portfolio}
+            if not all(m.reachable.values()):
+                unreachable += 1
+                self.log.debug("{} has unreachable URLs: {}".format(
+                    m.email, [u for u, r in m.reachable.items() if not r]))
+        self.log.info("Checked {} URLs, {} volunteers have unreachable ones".format(len(results), unreachable))
+        self.save()
+        return results
+
+    def save(self):
+        if not self.cache_path:
+            return
+        tmp = self.cache_path + '.tmp'
+        with open(tmp, 'w') as f:
+            json.dump(self.cache, f, indent=4, sort_keys=True)
+        os.replace(tmp, self.cache_path)
+
+    async def check(self, urls: Iterable[str]) -> Dict[str, Dict]:
+        """
+        Checks all the URLs that aren't already in the cache.
+        :param urls: the URLs to check.
+        :return: the result of every URL.
+        """
+        self.limit = asyncio.Semaphore(self.concurrency)
+        self.hosts = dict()
+        self.idle = dict()
+        now = time.time()
+        results = dict()
+        pending = list()
+        for url in urls:
+            cached = self.cache.get(url)
+            if cached and now - cached['checked'] < self.ttl:
+                results[url] = cached
+            else:
+                pending.append(url)
+        try:
+            for url, result in zip(pending, await asyncio.gather(*(self.check_url(u) for u in pending))):
+                results[url] = result
+                # Only real answers are cached, a timeout or a dropped connection is tried again next run.
+                if result['status'] is not None:
+                    self.cache[url] = result
+                else:
+                    self.cache.pop(url, None)
+        finally:
+            for connections in self.idle.values():
+                for reader, writer in connections:
+                    writer.close()
+            self.idle = dict()
+        return results
+
+    async def check_url(self, url: str) -> Dict:
+        """
+        Sends a HEAD request to a single URL.
+        :param url: the URL to check.
+        :return: the status, whether it is reachable, and the error if there was one.
+        """
+        result = {'status': None, 'reachable': False, 'error': None, 'checked': time.time()}
+        try:
+            scheme, host, port, path = PortfolioChecker.split(url)
+        except ValueError as e:
+            result['error'] = str(e)
+            return result
+        key = (scheme, host, port)
+        if key not in self.hosts:
+            self.hosts[key] = asyncio.Semaphore(self.per_host)
+        # The host's own limit is waited on first, so a queue for one busy host never holds
+        # the global slots that requests to the other hosts need.
+        async with self.hosts[key], self.limit:
+            try:
+                status = await asyncio.wait_for(self.head(key, path), self.timeout)
+            except asyncio.TimeoutError:
+                result['error'] = "timed out after {}s".format(self.timeout)
+            except (OSError, ValueError, asyncio.IncompleteReadError) as e:
+                result['error'] = "{}: {}".format(e.__class__.__name__, e)
+            else:
+                result['status'] = status
+                # Some servers refuse HEAD, but they still answered.
+                result['reachable'] = status < 400 or status == 405
+        return result
+
+    async def head(self, key: Tuple, path: str) -> int:
+        """
+        Sends the request over a pooled connection, opening a new one if
+        none are idle, or if the idle one was closed by the server.
+        :param key: the scheme, host and port.
+        :param path: the path of the request.
+        :return: the HTTP status.
+        """
+        scheme, host, port = key
+        authority = host if port == (443 if scheme == 'https' else 80) else "{}:{}".format(host, port)
+        request = ("HEAD {} HTTP/1.1\r\nHost: {}\r\nUser-Agent: YVVolunteers\r\n"
+                   "Accept: */*\r\nConnection: keep-alive\r\n\r\n").format(path, authority).encode('latin-1')
+        idle = self.idle.setdefault(key, list())
+        while True:
+            reused = bool(idle)
+            if reused:
+                reader, writer = idle.pop()
+            else:
+                reader, writer = await asyncio.open_connection(
+                    host, port, ssl=self.ssl if scheme == 'https' else None)
+            try:
+                writer.write(request)
+                await writer.drain()
+                status, keep_alive = await PortfolioChecker.read_response(reader)
+            except (OSError, asyncio.IncompleteReadError, ValueError):
+                writer.close()
+                if reused:
+                    continue
+                raise
+            except BaseException:
+                writer.close()
+                raise
+            if keep_alive:
+                idle.append((reader, writer))
+            else:
+                writer.close()
+            return status
+
+    @staticmethod
+    async def read_response(reader: asyncio.StreamReader) -> Tuple[int, bool]:
+        """
+        Reads the status line and headers of a response to a HEAD request,
+        which never has a body.
+        :param reader: the connection.
+        :return: the status and whether the connection can be reused.
+        """
+        line = await reader.readline()
+        if not line:
+            raise asyncio.IncompleteReadError(line, None)
+        parts = line.decode('latin-1').split(None, 2)
+        if len(parts) < 2 or not parts[0].startswith('HTTP/'):
+            raise ValueError("bad status line {!r}".format(line))
+        status = int(parts[1])
+        keep_alive = parts[0] == 'HTTP/1.1'
+        while True:
+            line = await reader.readline()
+            if not line:
+                raise asyncio.IncompleteReadError(line, None)
+            if line in (b'\r\n', b'\n'):
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            if name.strip().lower() == 'connection':
+                value = value.strip().lower()
+                if value == 'close':
+                    keep_alive = False
+                elif value == 'keep-alive':
+                    keep_alive = True
+        return status, keep_alive
+
+    @staticmethod
+    def split(url: str) -> Tuple[str, str, int, str]:
+        """
+        Splits a URL into the parts needed for a request.
+        Volunteers often leave off the scheme, so https is assumed.
+        :param url: the URL as the volunteer wrote it.
+        :return: the scheme, host, port and path.
+        """
+        url = url.strip()
+        if '://' not in url:
+            url = 'https://' + url
+        parts = urlsplit(url)
+        if parts.scheme not in ('http', 'https'):
+            raise ValueError("unsupported scheme '{}'".format(parts.scheme))
+        if not parts.hostname:
+            raise ValueError("no host in '{}'".format(url))
+        port = parts.port or (443 if parts.scheme == 'https' else 80)
+        path = parts.path or '/'
+        if parts.query:
+            path += '?' + parts.query
+        return parts.scheme, parts.hostname, port, path
@@ -0,0 +1,164 @@
+import heapq
+import json
+import logging
+from typing import Dict, Iterable, List, Optional
+
+
+class GroupRepair(object):
+    """
+    Repairs existing groups after volunteers drop out.
+    Only the groups that lost members are touched: they pull
+    members from over-capacity groups, or are merged into the
+    group with the most room, so working teams stay as they are.
+    """
+    def __init__(self, size: Optional[int] = None, minimum: Optional[int] = None):
+        """
+        :param size: the max group size, defaults to the largest group of the teams being repaired.
+        :param minimum: groups smaller than this get repaired, defaults to one less than size.
+        """
+        self.log = logging.getLogger(self.__class__.__name__)
+        self.requested_size = size
+        self.requested_minimum = minimum
+        self.size = size
+        self.minimum = minimum
+
+    @staticmethod
+    def read_removed(path: str) -> List[str]:
+        """
+        Reads the keys of the volunteers that dropped out, one per line.
+        :param path: path to the file of keys.
+        :return: the keys.
+        """
+        with open(path, 'r') as f:
+            return [line.strip() for line in f if line.strip()]
+
+    def repair_file(self, teams: str, removed: str) -> str:
+        """
+        Repairs the groups of a previous run.
+        :param teams: path to the output.json of a previous run.
+        :param removed: path to the keys of the volunteers that dropped out.
+        :return: the repaired groups as json.
+        """
+        with open(teams, 'r') as f:
+            output = json.load(f)
+        self.repair(output, GroupRepair.read_removed(removed))
+        return json.dumps(output, indent=4, sort_keys=True)
+
+    def repair(self, output: Dict, removed: Iterable[str]) -> Dict:
+        """
+        Drops the removed volunteers and rebalances the groups they were in.
+        :param output: the parsed output of a heuristic, changed in place.
+        :param removed: the keys of the volunteers that dropped out.
+        :return: the repaired output.
+        """
+        removed = set(removed)
+        groups = output['groups']
+        # The teams were built with some size, guessing it wrong would make intact groups donors.
+        self.size = self.requested_size
+        if self.size is None:
+            self.size = max((len(g['members']) for g in groups.values()), default=1)
+            self.log.info("Using a group size of {} from the teams".format(self.size))
+        self.minimum = self.requested_minimum
+        if self.minimum is None:
+            self.minimum = max(1, self.size - 1)
+        leaders = len(output.get('leaders', list()))
+        output['leaders'] = [l for l in output.get('leaders', list()) if l not in removed]
+
+        affected = list()
+        dropped = 0
+        for gid, group in groups.items():
+            before = len(group['members'])
+            group['members'] = [m for m in group['members'] if m not in removed]
+            if group.get('leader') in removed:
+                group['leader'] = None
+            if len(group['members']) != before:
+                dropped += before - len(group['members'])
+                affected.append(gid)
+
+        # Groups keyed by how much room they have, and by how far over capacity they are.
+        # Entries go stale as groups change, so they are checked when they are popped.
+        # Empty groups are left alone, moving a team into one would only rename it.
+        spare = [(-self.free(group), gid) for gid, group in groups.items()
+                 if group['members'] and self.free(group) > 0]
+        donors = [(-self.surplus(group), gid) for gid, group in groups.items() if self.surplus(group) > 0]
+        heapq.heapify(spare)
+        heapq.heapify(donors)
+
+        pulled = 0
+        merged = 0
+        emptied = 0
+        for gid in sorted(affected, key=lambda x: len(groups[x]['members'])):
+            group = groups.get(gid)
+            if group is None or len(group['members']) >= self.minimum:
+                continue
+            if not group['members']:
+                del groups[gid]
+                emptied += 1
+                continue
+
+            while len(group['members']) < self.minimum:
+                donor = self.pop(donors, groups, self.surplus)
+                if donor is None:
+                    break
+                group['members'].append(groups[donor]['members'].pop())
+                pulled += 1
+                if self.surplus(groups[donor]) > 0:
+                    heapq.heappush(donors, (-self.surplus(groups[donor]), donor))
+
+            if len(group['members']) < self.minimum:
+                target = self.pop(spare, groups, self.free, skip=gid)
+                if target is not None and self.free(groups[target]) >= len(group['members']):
+                    groups[target]['members'].extend(group['members'])
+                    del groups[gid]
+                    merged += 1
+                    group = groups[target]
+                    gid = target
+                elif target is not None:
+                    heapq.heappush(spare, (-self.free(groups[target]), target))
+            # The room this group has changed, so its entry in the heap did too.
+            if self.free(group) > 0:
+                heapq.heappush(spare, (-self.free(group), gid))
+
+        for group in groups.values():
+            if 'size' in group:
+                group['size'] = len(group['members'])
+        admin = output.setdefault('admin', dict())
+        if 'volunteers' in admin:
+            admin['volunteers'] -= dropped
+        if 'leaders' in admin:
+            admin['leaders'] -= leaders - len(output['leaders'])
+        admin['repair'] = {'removed': len(removed), 'affected': len(affected), 'pulled': pulled,
+                           'merged': merged, 'emptied': emptied}
+        self.log.info("Repaired {} groups: {} members pulled, {} groups merged, {} emptied".format(
+            len(affected), pulled, merged, emptied))
+        return output
+
+    def pop(self, heap: List, groups: Dict, measure, skip: Optional[str] = None) -> Optional[str]:
+        """
+        Pops the group at the top of the heap, dropping stale entries along the way.
+        :param heap: the heap to pop from.
+        :param groups: all of the groups.
+        :param measure: what the heap is keyed by.
+        :param skip: a group that may not be popped.
+        :return: the id of the group, or None if there isn't one.
+        """
+        skipped = None
+        result = None
+        while heap:
+            value, gid = heapq.heappop(heap)
+            if gid not in groups or -value != measure(groups[gid]) or -value <= 0:
+                continue
+            if gid == skip:
+                skipped = (value, gid)
+                continue
+            result = gid
+            break
+        if skipped is not None:
+            heapq.heappush(heap, skipped)
+        return result
+
+    def free(self, group: Dict) -> int:
+        return self.size - len(group['members'])
+
+    def surplus(self, group: Dict) -> int:
+        return len(group['members']) - self.size
@@ -0,0 +1,204 @@
+import json
+import logging
+import sqlite3
+import time
+from typing import Dict, Iterable, List, Optional
+from member import Member, Developer
+from enums import ProgrammingLanguages as PL
+
+
+class VolunteerStore(object):
+    """
+    An optional SQLite backend for the parsed volunteers.
+    This keeps members, their skills, and every group
+    assignment that has been made across runs.
+    """
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS members (
+            key         TEXT PRIMARY KEY,
+            uid         INTEGER,
+            roles       INTEGER NOT NULL DEFAULT 0,
+            experience  INTEGER NOT NULL DEFAULT 0,
+            frontend    INTEGER NOT NULL DEFAULT 0,
+            backend     INTEGER NOT NULL DEFAULT 0,
+            portfolio   TEXT,
+            seen        INTEGER NOT NULL DEFAULT 0
+        );
+        CREATE TABLE IF NOT EXISTS imports (
+            id          INTEGER PRIMARY KEY AUTOINCREMENT,
+            created     REAL NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS member_languages (
+            key         TEXT NOT NULL REFERENCES members(key) ON DELETE CASCADE,
+            language    TEXT NOT NULL,
+            PRIMARY KEY (key, language)
+        );
+        CREATE TABLE IF NOT EXISTS member_frameworks (
+            key         TEXT NOT NULL REFERENCES members(key) ON DELETE CASCADE,
+            framework   TEXT NOT NULL,
+            PRIMARY KEY (key, framework)
+        );
+        CREATE TABLE IF NOT EXISTS member_ci (
+            key         TEXT NOT NULL REFERENCES members(key) ON DELETE CASCADE,
+            platform    TEXT NOT NULL,
+            PRIMARY KEY (key, platform)
+        );
+        CREATE TABLE IF NOT EXISTS runs (
+            id          INTEGER PRIMARY KEY AUTOINCREMENT,
+            created     REAL NOT NULL,
+            heuristic   TEXT NOT NULL,
+            size        INTEGER NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS assignments (
+            run         INTEGER NOT NULL REFERENCES runs(id) ON DELETE CASCADE,
+            grp         TEXT NOT NULL,
+            key         TEXT NOT NULL,
+            PRIMARY KEY (run, key)
+        );
+        CREATE INDEX IF NOT EXISTS idx_members_experience ON members(experience);
+        CREATE INDEX IF NOT EXISTS idx_languages_language ON member_languages(language, key);
+        CREATE INDEX IF NOT EXISTS idx_frameworks_framework ON member_frameworks(framework, key);
+        CREATE INDEX IF NOT EXISTS idx_ci_platform ON member_ci(platform, key);
+        CREATE INDEX IF NOT EXISTS idx_assignments_key ON assignments(key, run);
+    """
+
+    def __init__(self, path: str, batch_size: int = 5000):
+        """
+        Open (or create) the database.
+        :param path: where the sqlite file lives, ':memory:' works too.
+        :param batch_size: how many members to insert per transaction.
+        """
+        self.log = logging.getLogger(self.__class__.__name__)
+        self.path = path
+        self.batch_size = batch_size
+        self.connection = sqlite3.connect(path)
+        self.connection.execute("PRAGMA foreign_keys = ON")
+        self.connection.execute("PRAGMA journal_mode = WAL")
+        self.connection.execute("PRAGMA synchronous = NORMAL")
+        self.connection.executescript(VolunteerStore.SCHEMA)
+
+    def close(self):
+        self.connection.close()
+
+    def __enter__(self) -> 'VolunteerStore':
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def save_volunteers(self, volunteers: Dict, quarantined: Iterable[str] = ()) -> int:
+        """
+        Bulk insert the parsed volunteers.
+        Members that already exist are replaced with the new data, and
+        members missing from this import are dropped, as they have left.
+        Their assignment history is kept.
+        :param volunteers: the output of Volunteers.build_volunteers.
+        :param quarantined: the keys of rows that were quarantined, these keep what was stored before.
+        :return: the number of members written.
+        """
+        with self.connection:
+            seen = self.connection.execute("INSERT INTO imports (created) VALUES (?)", (time.time(),)).lastrowid
+        total = 0
+        batch = list()
+        for group in ('leaders', 'members'):
+            for m in volunteers[group]:
+                batch.append(m)
+                if len(batch) >= self.batch_size:
+                    total += self._insert_batch(batch, seen)
+                    batch = list()
+        if batch:
+            total += self._insert_batch(batch, seen)
+        with self.connection:
+            self.connection.executemany("UPDATE members SET seen = ? WHERE key = ?",
+                                        [(seen, key) for key in quarantined])
+            gone = self.connection.execute("DELETE FROM members WHERE seen < ?", (seen,)).rowcount
+        self.log.info("Stored {} volunteers in {}, dropped {} that have left".format(total, self.path, gone))
+        return total
+
+    def _insert_batch(self, batch: List[Member], seen: int) -> int:
+        members = list()
+        languages = list()
+        frameworks = list()
+        ci = list()
+        for m in batch:
+            members.append((m.email, m.uid, int(m.roles), m.experience, m.ranking['frontend'],
+                            m.ranking['backend'], json.dumps(m.portfolio), seen))
+            languages.extend((m.email, l.name) for l in m.ranking['languages'])
+            frameworks.extend((m.email, f) for f in m.ranking['frameworks'])
+            for p in m.professions:
+                if isinstance(p, Developer):
+                    ci.extend((m.email, c.name) for c in p.ci_frameworks)
+        keys = [(m.email,) for m in batch]
+        with self.connection:
+            # Clear out the old skills so a re-import doesn't leave stale rows behind.
+            self.connection.executemany("DELETE FROM member_languages WHERE key = ?", keys)
+            self.connection.executemany("DELETE FROM member_frameworks WHERE key = ?", keys)
+            self.connection.executemany("DELETE FROM member_ci WHERE key = ?", keys)
+            self.connection.executemany(
+                "INSERT INTO members (key, uid, roles, experience, frontend, backend, portfolio, seen) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET uid = excluded.uid, roles = excluded.roles, "
+                "experience = excluded.experience, frontend = excluded.frontend, "
+                "backend = excluded.backend, portfolio = excluded.portfolio, seen = excluded.seen", members)
+            self.connection.executemany("INSERT OR IGNORE INTO member_languages VALUES (?, ?)", languages)
+            self.connection.executemany("INSERT OR IGNORE INTO member_frameworks VALUES (?, ?)", frameworks)
+            self.connection.executemany("INSERT OR IGNORE INTO member_ci VALUES (?, ?)", ci)
+        return len(batch)
+
+    def save_assignments(self, heuristic: str, size: int, groups: str) -> int:
+        """
+        Record the groups of a run so we keep a history of who was placed where.
+        :param heuristic: name of the heuristic that built the groups.
+        :param size: the group size of the run.
+        :param groups: the json output of a heuristic.
+        :return: the id of the run.
+        """
+        output = json.loads(groups)
+        rows = list()
+        with self.connection:
+            run = self.connection.execute("INSERT INTO runs (created, heuristic, size) VALUES (?, ?, ?)",
+                                          (time.time(), heuristic, size)).lastrowid
+            for gid, group in output['groups'].items():
+                rows.extend((run, gid, key) for key in group['members'])
+                if len(rows) >= self.batch_size:
+                    self.connection.executemany("INSERT OR REPLACE INTO assignments VALUES (?, ?, ?)", rows)
+                    rows = list()
+            self.connection.executemany("INSERT OR REPLACE INTO assignments VALUES (?, ?, ?)", rows)
+        return run
+
+    def candidates(self, language: Optional[PL] = None, framework: Optional[str] = None,
+                   ci: Optional[str] = None, min_experience: int = 0) -> List[str]:
+        """
+        Pull the keys of the members matching all of the given criteria.
+        Each criteria is answered by an index rather than a scan of the members.
+        :param language: a programming language they know.
+        :param framework: a framework they know.
+        :param ci: a continuous integration platform they use.
+        :param min_experience: the least experience they should have.
+        :return: the keys of the matching members, most experienced first.
+        """
+        query = "SELECT m.key FROM members m"
+        params = list()
+        if language is not None:
+            query += " JOIN member_languages l ON l.key = m.key AND l.language = ?"
+            params.append(language.name)
+        if framework is not None:
+            query += " JOIN member_frameworks f ON f.key = m.key AND f.framework = ?"
+            params.append(framework)
+        if ci is not None:
+            query += " JOIN member_ci c ON c.key = m.key AND c.platform = ?"
+            params.append(ci)
+        query += " WHERE m.experience >= ? ORDER BY m.experience DESC, m.key"
+        params.append(min_experience)
+        return [r[0] for r in self.connection.execute(query, params)]
+
+    def history(self, key: str) -> List[Dict]:
+        """
+        Every group a member has been assigned to, oldest run first.
+        :param key: the member's unique key.
+        :return: list of runs and the group they were placed in.
+        """
+        rows = self.connection.execute(
+            "SELECT r.id, r.created, r.heuristic, a.grp FROM assignments a JOIN runs r ON r.id = a.run "
+            "WHERE a.key = ? ORDER BY r.id", (key,))
+        return [{'run': r[0], 'created': r[1], 'heuristic': r[2], 'group': r[3]} for r in rows]
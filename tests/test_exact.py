@@ -0,0 +1,95 @@
+import itertools
+import json
+import os
+import random
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from enums import ProgrammingLanguages as PL
+from heuristics import ExactHeuristic, Heuristic
+from member import Member
+
+LANGUAGES = [PL.PYTHON, PL.JAVA, PL.JAVASCRIPT, PL.SQL, PL.PHP]
+FRAMEWORKS = ['react', 'node', 'django', 'flask', 'vue']
+
+
+def cohort(r: random.Random, n: int) -> dict:
+    members = list()
+    for i in range(n):
+        ranking = {'frontend': 0, 'backend': 0, 'rids': 0,
+                   'languages': set(r.sample(LANGUAGES, r.randint(0, 3))),
+                   'frameworks': set(r.sample(FRAMEWORKS, r.randint(0, 3)))}
+        members.append(Member(i, 'm{}@example.com'.format(i), list(), set(), ranking))
+    return {'members': members, 'leaders': list()}
+
+
+def partitions(items: list, size: int, count: int):
+    """
+    Every way to split the items into at most count groups of at most size.
+    """
+    if not items:
+        yield list()
+        return
+    if not count:
+        return
+    first, rest = items[0], items[1:]
+    for k in range(min(size - 1, len(rest)) + 1):
+        for others in itertools.combinations(rest, k):
+            left = [x for x in rest if x not in others]
+            for p in partitions(left, size, count - 1):
+                yield [[first, *others]] + p
+
+
+def brute_force(volunteers: dict, size: int) -> int:
+    skills = [Heuristic.skills(m) for m in volunteers['members']]
+    count = (len(skills) + size - 1) // size
+    return max(sum(len(skills[a] & skills[b]) for group in p for a, b in itertools.combinations(group, 2))
+               for p in partitions(list(range(len(skills))), size, count))
+
+
+class Unseeded(ExactHeuristic):
+    """
+    Starts the search without the greedy groups, the greedy groups are
+    often already the best, which leaves the bounds of the search untested.
+    """
+    def greedy(self, n: int, restarts: int = 20):
+        pass
+
+
+class TestExactHeuristic(unittest.TestCase):
+
+    def test_matches_brute_force(self):
+        self.check(ExactHeuristic)
+
+    def test_search_matches_brute_force(self):
+        self.check(Unseeded)
+
+    def check(self, heuristic_class):
+        r = random.Random(7)
+        for _ in range(40):
+            n = r.randint(4, 10)
+            size = r.randint(2, 4)
+            volunteers = cohort(r, n)
+            heuristic = heuristic_class(size)
+            output = heuristic.build_groups(volunteers)
+            groups = json.loads(output)['groups']
+
+            placed = [m for g in groups.values() for m in g['members']]
+            self.assertCountEqual([m.email for m in volunteers['members']], placed)
+            self.assertLessEqual(len(groups), (n + size - 1) // size)
+            self.assertTrue(all(len(g['members']) <= size for g in groups.values()))
+
+            self.assertTrue(heuristic.administrative['optimal'])
+            self.assertEqual(Heuristic.score(output, volunteers), heuristic.administrative['score'])
+            self.assertEqual(brute_force(volunteers, size), heuristic.administrative['score'],
+                             "n={} size={}".format(n, size))
+
+    def test_no_members(self):
+        output = json.loads(ExactHeuristic(3).build_groups({'members': list(), 'leaders': list()}))
+        self.assertEqual({}, output['groups'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,128 @@
+import asyncio
+import os
+import sys
+import tempfile
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from portfolio import PortfolioChecker
+
+
+class StandIn(BaseHTTPRequestHandler):
+    """
+    A stand-in for the portfolio hosts, the path decides the answer.
+    """
+    protocol_version = 'HTTP/1.1'
+
+    def do_HEAD(self):
+        self.server.requests.append(self.path)
+        self.server.answered.append(time.time())
+        self.server.connections.add(self.client_address)
+        if self.path.startswith('/slow'):
+            time.sleep(1)
+        elif self.path.startswith('/busy'):
+            time.sleep(0.2)
+        if self.path.startswith('/missing'):
+            status = 404
+        elif self.path.startswith('/nohead'):
+            status = 405
+        else:
+            status = 200
+        self.send_response(status)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+class TestPortfolioChecker(unittest.TestCase):
+
+    def setUp(self):
+        self.server = self.serve()
+        self.base = 'http://127.0.0.1:{}'.format(self.server.server_address[1])
+        self.directory = tempfile.TemporaryDirectory()
+        self.cache = os.path.join(self.directory.name, 'url_cache.json')
+
+    def tearDown(self):
+        self.stop(self.server)
+        self.directory.cleanup()
+
+    @staticmethod
+    def serve() -> ThreadingHTTPServer:
+        server = ThreadingHTTPServer(('127.0.0.1', 0), StandIn)
+        server.requests = list()
+        server.answered = list()
+        server.connections = set()
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        return server
+
+    @staticmethod
+    def stop(server: ThreadingHTTPServer):
+        server.shutdown()
+        server.server_close()
+
+    def check(self, urls, **kwargs):
+        checker = PortfolioChecker(self.cache, timeout=0.5, **kwargs)
+        results = asyncio.run(checker.check(urls))
+        checker.save()
+        return results
+
+    def test_statuses(self):
+        results = self.check([self.base + '/ok', self.base + '/missing', self.base + '/nohead'])
+        self.assertEqual(200, results[self.base + '/ok']['status'])
+        self.assertTrue(results[self.base + '/ok']['reachable'])
+        self.assertEqual(404, results[self.base + '/missing']['status'])
+        self.assertFalse(results[self.base + '/missing']['reachable'])
+        self.assertEqual(405, results[self.base + '/nohead']['status'])
+        self.assertTrue(results[self.base + '/nohead']['reachable'])
+
+    def test_timeout(self):
+        result = self.check([self.base + '/slow'])[self.base + '/slow']
+        self.assertIsNone(result['status'])
+        self.assertFalse(result['reachable'])
+        self.assertIn('timed out', result['error'])
+
+    def test_connection_refused(self):
+        result = self.check(['http://127.0.0.1:1/'])['http://127.0.0.1:1/']
+        self.assertIsNone(result['status'])
+        self.assertFalse(result['reachable'])
+
+    def test_connections_are_reused(self):
+        urls = [self.base + '/ok/{}'.format(x) for x in range(50)]
+        results = self.check(urls, per_host=2)
+        self.assertTrue(all(r['reachable'] for r in results.values()))
+        self.assertEqual(50, len(self.server.requests))
+        self.assertLessEqual(len(self.server.connections), 2)
+
+    def test_busy_host_does_not_block_others(self):
+        other = self.serve()
+        try:
+            fast = 'http://127.0.0.1:{}/ok'.format(other.server_address[1])
+            urls = [self.base + '/busy/{}'.format(x) for x in range(20)] + [fast]
+            start = time.time()
+            results = self.check(urls, concurrency=4, per_host=2)
+            self.assertTrue(results[fast]['reachable'])
+            # The busy host takes about two seconds, the other one is answered straight away.
+            self.assertLess(other.answered[0] - start, 0.5)
+        finally:
+            self.stop(other)
+
+    def test_cache(self):
+        urls = [self.base + '/ok', self.base + '/missing', self.base + '/slow']
+        self.check(urls)
+        self.assertEqual(3, len(self.server.requests))
+        results = self.check(urls)
+        # Only the URL that timed out is asked for again.
+        self.assertEqual(4, len(self.server.requests))
+        self.assertEqual('/slow', self.server.requests[-1])
+        self.assertEqual(200, results[self.base + '/ok']['status'])
+        self.assertEqual(404, results[self.base + '/missing']['status'])
+
+
+if __name__ == '__main__':
+    unittest.main()
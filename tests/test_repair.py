@@ -0,0 +1,75 @@
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from repair import GroupRepair
+
+
+def teams(**groups) -> dict:
+    """
+    A minimal output.json, one group per keyword.
+    """
+    return {'groups': {gid: {'members': list(members), 'leader': None, 'size': len(members)}
+                       for gid, members in groups.items()},
+            'leaders': list(),
+            'admin': {'volunteers': sum(len(m) for m in groups.values()), 'leaders': 0}}
+
+
+class TestGroupRepair(unittest.TestCase):
+
+    def test_pull_from_over_capacity_group(self):
+        output = teams(a=['a1', 'a2', 'a3'], d=['d1', 'd2', 'd3', 'd4'], b=['b1', 'b2', 'b3'])
+        GroupRepair(3).repair(output, ['a2', 'a3'])
+        groups = output['groups']
+        self.assertEqual(['a1', 'd4'], groups['a']['members'])
+        self.assertEqual(['d1', 'd2', 'd3'], groups['d']['members'])
+        self.assertEqual(['b1', 'b2', 'b3'], groups['b']['members'])
+        self.assertEqual(1, output['admin']['repair']['pulled'])
+        self.assertEqual(8, output['admin']['volunteers'])
+        self.assertEqual(2, groups['a']['size'])
+
+    def test_merge_into_group_with_room(self):
+        output = teams(x=['x1', 'x2', 'x3', 'x4'], y=['y1', 'y2'], z=['z1', 'z2', 'z3', 'z4'])
+        GroupRepair(4).repair(output, ['x2', 'x3', 'x4'])
+        groups = output['groups']
+        self.assertNotIn('x', groups)
+        self.assertEqual(['y1', 'y2', 'x1'], groups['y']['members'])
+        self.assertEqual(['z1', 'z2', 'z3', 'z4'], groups['z']['members'])
+        self.assertEqual(1, output['admin']['repair']['merged'])
+
+    def test_pulled_group_stays_open(self):
+        # The first group pulls two members and still has room, the second merges into it.
+        output = teams(a=['a1', 'a2', 'a3', 'a4'], d=['d1', 'd2', 'd3', 'd4', 'd5', 'd6'],
+                       c=['c1', 'c2', 'c3', 'c4'])
+        GroupRepair(4).repair(output, ['a2', 'a3', 'a4', 'c2', 'c3', 'c4'])
+        groups = output['groups']
+        self.assertNotIn('c', groups)
+        self.assertEqual(['a1', 'd6', 'd5', 'c1'], groups['a']['members'])
+        self.assertEqual(['d1', 'd2', 'd3', 'd4'], groups['d']['members'])
+        self.assertEqual(2, output['admin']['repair']['pulled'])
+        self.assertEqual(1, output['admin']['repair']['merged'])
+
+    def test_emptied_group_is_dropped(self):
+        output = teams(a=['a1', 'a2'], b=['b1', 'b2', 'b3'])
+        output['groups']['a']['leader'] = 'a1'
+        GroupRepair(3).repair(output, ['a1', 'a2'])
+        self.assertEqual(['b'], list(output['groups']))
+        self.assertEqual(1, output['admin']['repair']['emptied'])
+        self.assertEqual(3, output['admin']['volunteers'])
+
+    def test_size_taken_from_teams(self):
+        output = teams(a=['a1', 'a2', 'a3', 'a4', 'a5'], b=['b1', 'b2', 'b3', 'b4', 'b5'],
+                       c=['c1', 'c2', 'c3', 'c4', 'c5'])
+        GroupRepair().repair(output, ['a1'])
+        groups = output['groups']
+        # With the default size of 3 the intact groups would have been donors.
+        self.assertEqual(['a2', 'a3', 'a4', 'a5'], groups['a']['members'])
+        self.assertEqual(5, len(groups['b']['members']))
+        self.assertEqual(5, len(groups['c']['members']))
+        self.assertEqual(0, output['admin']['repair']['pulled'])
+
+
+if __name__ == '__main__':
+    unittest.main()
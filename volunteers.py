@@ -6,6 +6,8 @@ from typing import Dict, List, Set
 from enums import ProgrammingLanguages as PL
 from enums import ContinuousIntegration as CI
 import re
+import math
+from collections import Counter
 
 
 class Volunteers(object):
@@ -13,56 +15,207 @@ class Volunteers(object):
     def __init__(self, config: cli.Config):
         self.log = logging.getLogger(self.__class__.__name__)
         self.config = config
+        self.quarantine_file = None
+        # The keys of the rows that were quarantined, they haven't left.
+        self.quarantined = list()
 
     def build_volunteers(self) -> Dict:
         """
         This parses the input file and builds the members and their roles.
+        In tolerant mode rows that fail validation are written to the
+        quarantine file instead of aborting the whole run.
         :return: List of users
         """
         volunteers = {'leaders': list(), 'members': list()}
+        quarantine = None
+        quarantined = 0
         with open(self.config.input_file, 'r') as csv_file:
             reader = csv.DictReader(csv_file, delimiter=',')
             uid = 1
+            try:
+                for row in reader:
+                    if self.config.tolerant:
+                        reasons = self.validate_row(row)
+                        member = None
+                        if not reasons:
+                            try:
+                                member = self.build_member(uid, row)
+                            except (ValueError, KeyError, TypeError, AttributeError) as e:
+                                reasons.append("{}: {}".format(e.__class__.__name__, e))
+                        if reasons:
+                            if quarantine is None:
+                                quarantine = self.open_quarantine(reader.fieldnames)
+                            quarantine.writerow(dict(row, quarantine_line=reader.line_num,
+                                                     quarantine_reason="; ".join(reasons)))
+                            quarantined += 1
+                            if row.get('Username'):
+                                self.quarantined.append(row['Username'])
+                            continue
+                    else:
+                        member = self.build_member(uid, row)
+                    if member.roles & RoleEnums.LEADER:
+                        volunteers['leaders'].append(member)
+                    else:
+                        volunteers['members'].append(member)
+                    uid += 1
+            finally:
+                if quarantine is not None:
+                    self.quarantine_file.close()
+        if quarantined:
+            self.log.warning("Quarantined {} rows to {}".format(quarantined, self.config.quarantine))
+        return volunteers
+
+    def build_member(self, uid: int, row: Dict) -> Member:
+        """
+        Builds a single member and their roles from a row of the input.
+        :param uid: the id to give the member.
+        :param row: full record row of the CSV file.
+        :return: the member.
+        """
+        roles = set()
+        rids = 0
+        frameworks = set()
+        languages = set()
+        portfolios = list()
+        experience = 0
+        if row["In general, I would consider myself capable of being a designer volunteer"] == "Yes":
+            if len(row["My portfolio's URL is"]) > 0:
+                portfolios.append(row["My portfolio's URL is"])
+            role = self.build_designer(uid, row)
+            experience += role.experience
+            frameworks.update(role.skills)
+            roles.add(role)
+            rids += role.rid
+
+        if row["In general, I would consider myself capable of being a volunteer developer"] == "Yes":
+            if len(row["Github URL"]) > 0:
+                portfolios.append(row["Github URL"])
+            role = self.build_developer(row)
+            frameworks.update(role.frameworks)
+            languages.update(role.languages)
+            experience += role.experience
+            roles.add(role)
+            rids += role.rid
+
+        if row["I would like to be considered for a team lead role"] == "Yes":
+            role = Leader(Volunteers.parse_experience(row["How long have you been managing people/product(s)"]))
+            roles.add(role)
+            rids += role.rid
+
+        return Member(uid, row['Username'], portfolios, roles,
+                      Member.build_ranking(self.config.taxonomy, frameworks=frameworks,
+                                           languages=languages, rids=rids), experience=experience)
+
+    def build_statistics(self) -> Dict:
+        """
+        Counts the supply of skills in the input in a single pass, without
+        building any members, so the memory used doesn't grow with the cohort.
+        :return: the counts and histograms, and suggestions for the groups.
+        """
+        designer = "In general, I would consider myself capable of being a designer volunteer"
+        developer = "In general, I would consider myself capable of being a volunteer developer"
+        leader = "I would like to be considered for a team lead role"
+        stats = {'rows': 0, 'rejected': 0, 'members': 0, 'leaders': 0, 'roles': Counter(), 'languages': Counter(),
+                 'frameworks': Counter(), 'design_skills': Counter(), 'continuous_integration': Counter(),
+                 'experience': {'designer': Counter(), 'developer': Counter(), 'leader': Counter()}}
+        synonyms = self.config.taxonomy['framework_synonyms']
+        with open(self.config.input_file, 'r') as csv_file:
+            reader = csv.DictReader(csv_file, delimiter=',')
             for row in reader:
-                roles = set()
+                stats['rows'] += 1
+                if self.config.tolerant and self.validate_row(row):
+                    stats['rejected'] += 1
+                    continue
                 rids = 0
                 frameworks = set()
-                languages = set()
-                portfolios = list()
-                experience = 0
-                if row["In general, I would consider myself capable of being a designer volunteer"] == "Yes":
-                    if len(row["My portfolio's URL is"]) > 0:
-                        portfolios.append(row["My portfolio's URL is"])
-                    role = self.build_designer(uid, row)
-                    experience += role.experience
-                    frameworks.update(role.skills)
-                    roles.add(role)
-                    rids += role.rid
-
-                if row["In general, I would consider myself capable of being a volunteer developer"] == "Yes":
-                    if len(row["Github URL"]) > 0:
-                        portfolios.append(row["Github URL"])
-                    role = self.build_developer(row)
-                    frameworks.update(role.frameworks)
-                    languages.update(role.languages)
-                    experience += role.experience
-                    roles.add(role)
-                    rids += role.rid
-
-                if row["I would like to be considered for a team lead role"] == "Yes":
-                    role = Leader(Volunteers.parse_experience(row["How long have you been managing people/product(s)"]))
-                    roles.add(role)
-                    rids += role.rid
-
-                member = Member(uid, row['Username'], portfolios, roles,
-                                Member.build_ranking(self.config.taxonomy, frameworks=frameworks,
-                                                     languages=languages, rids=rids), experience=experience)
-                if rids & RoleEnums.LEADER:
-                    volunteers['leaders'].append(member)
+                if row[designer] == "Yes":
+                    rids += RoleEnums.DESIGNER
+                    frameworks.update(
+                        self.parse_frameworks(row["The framework I would say I'm most confident in is"]))
+                    stats['design_skills'].update(
+                        self.parse_design_skills(row["My top 3 design skills are"].split(";")))
+                    stats['experience']['designer'][Volunteers.parse_experience(row["I've been a designer for"])] += 1
+                if row[developer] == "Yes":
+                    rids += RoleEnums.DEVELOPER
+                    frameworks.update(self.parse_frameworks(row["My top 3 frameworks are"]))
+                    languages = self.parse_programming_languages(row["My top 3 programming languages are"])
+                    stats['languages'].update(l.name for l in languages)
+                    ci = self.parse_ci_frameworks(row["If yes, which CI platform(s)"])
+                    stats['continuous_integration'].update(c.name for c in ci)
+                    years = Volunteers.parse_experience(row["I've been a programming for"])
+                    stats['experience']['developer'][years] += 1
+                if row[leader] == "Yes":
+                    rids += RoleEnums.LEADER
+                    years = Volunteers.parse_experience(row["How long have you been managing people/product(s)"])
+                    stats['experience']['leader'][years] += 1
+                    stats['leaders'] += 1
                 else:
-                    volunteers['members'].append(member)
-                uid += 1
-        return volunteers
+                    stats['members'] += 1
+                stats['frameworks'].update({synonyms.get(f, f) for f in frameworks})
+                stats['roles']['|'.join(r.name for r in RoleEnums if r & rids) or 'NONE'] += 1
+
+        stats['suggestions'] = self.suggest_groups(stats)
+        return stats
+
+    def suggest_groups(self, stats: Dict) -> Dict:
+        """
+        Suggests a group size so that every group can have a leader and a designer.
+        Sizes are kept between 2 and 10, when that needs more than 10 the size is
+        10 and `covered` is false, as some groups will be left without one.
+        :param stats: the output of build_statistics.
+        :return: the suggested size and number of groups, and whether every group is covered.
+        """
+        members = stats['members']
+        designers = sum(c for r, c in stats['roles'].items() if 'DESIGNER' in r.split('|') and 'LEADER' not in r)
+        by_leaders = math.ceil(members / stats['leaders']) if stats['leaders'] else None
+        by_designers = math.ceil(members / designers) if designers else None
+        limits = [s for s in (by_leaders, by_designers) if s is not None]
+        size = min(max(max(limits), 2), 10) if limits else self.config.group_size
+        return {'group_size': size, 'groups': math.ceil(members / size) if members else 0,
+                'by_leaders': by_leaders, 'by_designers': by_designers,
+                'covered': len(limits) == 2 and size >= max(limits)}
+
+    def validate_row(self, row: Dict) -> List:
+        """
+        Checks a row for the problems that would otherwise abort the ingestion.
+        :param row: full record row of the CSV file.
+        :return: the reasons the row is bad, empty if it is fine.
+        """
+        reasons = list()
+        missing = [k for k, v in row.items() if k is not None and v is None]
+        if missing:
+            reasons.append("row is missing {} of {} columns".format(len(missing), len(row)))
+        if not row.get('Username'):
+            reasons.append("missing Username")
+        frameworks = set()
+        if row.get("In general, I would consider myself capable of being a designer volunteer") == "Yes":
+            frameworks.update(
+                self.parse_frameworks(row.get("The framework I would say I'm most confident in is") or ''))
+        if row.get("In general, I would consider myself capable of being a volunteer developer") == "Yes":
+            for field in ("I am confident in my backend skills", "I am confident in my front end skills",
+                          "I know Test-Driven Development (TDD)"):
+                try:
+                    int(row.get(field) or '')
+                except ValueError:
+                    reasons.append("'{}' is not a number: {!r}".format(field, row.get(field)))
+            frameworks.update(self.parse_frameworks(row.get("My top 3 frameworks are") or ''))
+        for f in frameworks:
+            fw = self.config.taxonomy['framework_synonyms'].get(f, f)
+            if fw not in self.config.taxonomy['frameworks']:
+                reasons.append("framework '{}' is not in the taxonomy".format(fw))
+        return reasons
+
+    def open_quarantine(self, fieldnames: List) -> csv.DictWriter:
+        """
+        Opens the quarantine file for the rejected rows.
+        :param fieldnames: the headers of the input file.
+        :return: a writer for the quarantined rows.
+        """
+        self.quarantine_file = open(self.config.quarantine, 'w', newline='')
+        writer = csv.DictWriter(self.quarantine_file, fieldnames=list(fieldnames) +
+                                ['quarantine_line', 'quarantine_reason'], extrasaction='ignore')
+        writer.writeheader()
+        return writer
 
     def parse_frameworks(self, js_fw: str) -> Set:
         """